@@ -5,9 +5,17 @@
 # LICENSE file in the root directory of this source tree.
 
 import argparse
+import contextlib
+import copy
+import functools
+import hashlib
+import os
+import pickle
 import sys
-from collections import defaultdict
-from typing import Tuple
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from types import MappingProxyType, SimpleNamespace
+from typing import Final
 
 import torch
 
@@ -16,18 +24,41 @@ try:
 except ModuleNotFoundError:
     import tomli as tomllib
 
+try:
+    # optional native toml parser, several times faster than tomllib
+    import rtoml
+    _TOML_DECODE_ERRORS = (tomllib.TOMLDecodeError, rtoml.TomlParsingError)
+except ModuleNotFoundError:
+    rtoml = None
+    _TOML_DECODE_ERRORS = (tomllib.TOMLDecodeError,)
+
 from torchtitan.tools.logging import logger
 
-TORCH_DTYPE_MAP = {
+TORCH_DTYPE_MAP: Final = MappingProxyType({
     "float16": torch.float16,
     "float32": torch.float32,
     "bfloat16": torch.bfloat16,
-}
+})
+
+# immutable `choices` of the parser arguments
+_MP_PARAM_CHOICES = ("bfloat16", "float32")
+_MP_REDUCE_CHOICES = ("float32",)
+_EXPORT_DTYPE_CHOICES = ("float16", "bfloat16", "float32")
+_OPTIMIZER_IMPL_CHOICES = ("for-loop", "foreach", "fused")
+_DECAY_TYPE_CHOICES = ("linear", "sqrt", "cosine")
+_FSDP_RESHARD_CHOICES = ("default", "always", "never")
+_FLOAT8_RECIPE_CHOICES = ("tensorwise", "rowwise", "rowwise_with_gw_hp")
+
+_TOML_CACHE_DIR = os.path.join("~", ".cache", "flame", "cfg")
 
 
 def string_list(raw_arg):
     """Comma-separated string list argument."""
-    return [s.strip() for s in raw_arg.split(",") if s.strip()]
+    if "," not in raw_arg:
+        # single value, the most common case
+        s = raw_arg.strip()
+        return [s] if s else []
+    return [s for s in map(str.strip, raw_arg.split(",")) if s]
 
 
 def check_string_list_argument(args_dict: dict[str, any], fullargname: str):
@@ -42,6 +73,1008 @@ def check_string_list_argument(args_dict: dict[str, any], fullargname: str):
         sec[name] = string_list(sec[name])
 
 
+def _load_toml(path: str) -> dict:
+    """
+    Load a toml file, reusing the parsed result pickled under `_TOML_CACHE_DIR`
+    as long as the file keeps the same path, inode, mtime, ctime and size.
+    The cache is best-effort: it is skipped whenever it cannot be read or written,
+    and can be disabled altogether with FLAME_NO_TOML_CACHE=1.
+    """
+    use_cache = os.environ.get("FLAME_NO_TOML_CACHE") != "1"
+    if use_cache:
+        # unlike the mtime, the ctime cannot be restored by `cp -p`, `rsync -t` or `tar x`
+        stat = os.stat(path)
+        key = f"{os.path.abspath(path)}:{stat.st_ino}:{stat.st_mtime_ns}:{stat.st_ctime_ns}:{stat.st_size}"
+        cache_dir = os.path.expanduser(_TOML_CACHE_DIR)
+        cache_file = os.path.join(cache_dir, hashlib.sha256(key.encode()).hexdigest() + ".pkl")
+        try:
+            with open(cache_file, "rb") as f:
+                config = pickle.load(f)
+            if type(config) is dict:
+                return config
+        except Exception:
+            # a stale or corrupt cache file is just a cache miss
+            pass
+
+    # pull the whole file in with a single read, then parse it from memory
+    with open(path, "rb") as f:
+        data = f.read().decode("utf-8")
+    config = rtoml.loads(data) if rtoml is not None else tomllib.loads(data)
+    if not use_cache:
+        return config
+    # write to a private file first so that concurrent ranks never see a partial pickle
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(tmp_file, "wb") as f:
+            pickle.dump(config, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except Exception:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_file)
+    return config
+
+
+def _find_config_file(args_list: list[str]) -> str | None:
+    """Get the `--job.config_file` value if it is spelled out in full on the command line."""
+    config_file = None
+    for i, arg in enumerate(args_list):
+        if arg == "--job.config_file" and i + 1 < len(args_list):
+            config_file = args_list[i + 1]
+        elif arg.startswith("--job.config_file="):
+            config_file = arg.partition("=")[2]
+    return config_file
+
+
+class _ArgumentParser(argparse.ArgumentParser):
+    """
+    `ArgumentParser` sharing a single formatter between its `add_argument` calls.
+    `add_argument` only needs a formatter to validate the metavar of the new action,
+    so there is no need to build a new one, and query the terminal size, every time.
+    Help and usage messages still get a fresh formatter.
+    """
+
+    _adding_argument = False
+    _validation_formatter = None
+
+    def add_argument(self, *args, **kwargs):
+        self._adding_argument = True
+        try:
+            return super().add_argument(*args, **kwargs)
+        finally:
+            self._adding_argument = False
+
+    def _get_formatter(self):
+        if not self._adding_argument:
+            return super()._get_formatter()
+        if self._validation_formatter is None:
+            self._validation_formatter = super()._get_formatter()
+        return self._validation_formatter
+
+
+# sentinel for the `add_argument` keywords that an `_ArgSpec` leaves unset
+_UNSET = object()
+
+_ArgSpec = namedtuple(
+    "_ArgSpec",
+    ["name", "type", "default", "nargs", "choices", "action", "dest", "help"],
+    defaults=(_UNSET,) * 7,
+)
+
+# declarative table of all the parser arguments, registered in order by `_build_parser`
+_ARG_SPECS: tuple[_ArgSpec, ...] = (
+    _ArgSpec(
+        "job.config_file",
+        type=str,
+        default=None,
+        help="Job config file",
+    ),
+
+    # job level configs
+    _ArgSpec(
+        "job.dump_folder",
+        type=str,
+        default="./torchtitan/outputs",
+        help="Folder to dump job outputs",
+    ),
+    _ArgSpec(
+        "job.description",
+        type=str,
+        default="default job",
+        help="Description of the job",
+    ),
+    _ArgSpec(
+        "job.use_for_integration_test",
+        action="store_true",
+        help="Add this config to the integration test suite",
+    ),
+    _ArgSpec(
+        "job.print_args",
+        action="store_true",
+        help="Print the args to terminal",
+    ),
+
+    # model configs
+    _ArgSpec(
+        "model.name",
+        type=str,
+        default="fla",
+        help="Which model to train",
+    ),
+    _ArgSpec(
+        "model.config",
+        type=str,
+        default="fla-hub/transformer-1.3B-100B",
+        help="Path to the model config",
+    ),
+    _ArgSpec(
+        "model.tokenizer_path",
+        type=str,
+        default="fla-hub/transformer-1.3B-100B",
+        help="Tokenizer path",
+    ),
+    _ArgSpec(
+        "model.converters",
+        type=string_list,
+        nargs="+",
+        default=[],
+        help="""
+            Comma separated list of converters to apply to the model.
+            For instance, the `float8` converter swaps `torch.nn.Linear`
+            with `Float8Linear`. This feature requires you to install 'torchao'
+            which can be found here: https://github.com/pytorch/ao
+        """,
+    ),
+    _ArgSpec(
+        "model.print_after_conversion",
+        action="store_true",
+        help="""
+        If true, model definition will be printed to stdout after all model
+        converters have been applied.
+        """,
+    ),
+
+    # profiling configs
+    _ArgSpec(
+        "profiling.enable_profiling",
+        action="store_true",
+        help="Whether to enable pytorch profiler",
+    ),
+    _ArgSpec(
+        "profiling.save_traces_folder",
+        type=str,
+        default="profile_traces",
+        help="Trace files location",
+    ),
+    _ArgSpec(
+        "profiling.profile_freq",
+        type=int,
+        default=10,
+        help="How often to collect profiler traces, in iterations",
+    ),
+    _ArgSpec(
+        "profiling.enable_memory_snapshot",
+        action="store_true",
+        help="Whether to dump memory snapshot",
+    ),
+    _ArgSpec(
+        "profiling.save_memory_snapshot_folder",
+        type=str,
+        default="memory_snapshot",
+        help="Memeory snapshot files location",
+    ),
+
+    # optimizer configs
+    _ArgSpec(
+        "optimizer.name", type=str, default="AdamW", help="Optimizer to use"
+    ),
+    _ArgSpec(
+        "optimizer.eps",
+        type=float,
+        default=1e-8,
+        help="Epsilon value for the optimizer.",
+    ),
+    _ArgSpec(
+        "optimizer.lr", type=float, default=8e-4, help="Learning rate to use"
+    ),
+    _ArgSpec(
+        "optimizer.beta1", type=float, default=0.9,
+        help="Exponential moving average hyperparameters to use"
+    ),
+    _ArgSpec(
+        "optimizer.beta2", type=float, default=0.95,
+        help="Exponential moving average hyperparameters to use"
+    ),
+    _ArgSpec(
+        "optimizer.weight_decay", type=float, default=0.1,
+        help="Weight decay to use"
+    ),
+    _ArgSpec(
+        "optimizer.implementation",
+        type=str,
+        default="fused",
+        choices=_OPTIMIZER_IMPL_CHOICES,
+        help="""
+        Specify which optimizer implementation to use:
+        - 'fused': Use fused implementation (CUDA only) for best performance.
+        - 'foreach': Use some horizontal fusion of tensors for better performance.
+        - 'for-loop': Use the default implementation for the optimizer (slowest).
+        - more info: https://pytorch.org/docs/stable/optim.html
+        """,
+    ),
+    _ArgSpec(
+        "optimizer.early_step_in_backward",
+        action="store_true",
+        help="""
+        Whether to apply optimizer in the backward. Caution, optimizer_in_backward
+        is not compatible with gradients clipping, users should not call
+        register_post_accumulate_grad_hook after the optimizer is built.""",
+    ),
+
+    # lr scheduler configs
+    _ArgSpec(
+        "lr_scheduler.warmup_steps",
+        type=int,
+        default=200,
+        help="Steps for lr scheduler warmup, normally 1/5 of --training.steps",
+    ),
+    _ArgSpec(
+        "lr_scheduler.decay_ratio",
+        type=float,
+        default=None,
+        help="""
+        Controls the proportion of the training steps allocated to the learning rate decay phase.
+
+        If `None`, the learning rate will begin decaying immediately after the warmup period.
+        Otherwise, the learning rate will remain stable after the warmup period and
+        only start decaying during the last `decay_ratio` portion of the total training steps.
+
+        This is known as the Warmup-Stable-Decay (WSD) schedule, as described in https://arxiv.org/abs/2404.06395.
+        """,
+    ),
+    _ArgSpec(
+        "lr_scheduler.decay_type",
+        type=str,
+        default="linear",
+        choices=_DECAY_TYPE_CHOICES,
+        help="""
+        Learning rate decay type to use during training:
+        - 'linear': linearly decays learning rate from initial to final value
+        - 'sqrt': decays learning rate following a 1 minus square root curve
+        - 'cosine': smoothly decays learning rate following a cosine curve
+        """,
+    ),
+    _ArgSpec(
+        "lr_scheduler.lr_min",
+        type=float,
+        default=0.0,
+        help="""
+        Min lr ratio for lr scheduler.
+
+        If provided, the range of decay factor is scaled from 1 to `lr_min`
+        to ensure the learning rate does not drop below `optimizer.lr * lr_scheduler.lr_min`.
+        """,
+    ),
+
+    # training configs
+    _ArgSpec(
+        "training.batch_size", type=int, default=8, help="Batch size"
+    ),
+    _ArgSpec(
+        "training.seq_len", type=int, default=2048, help="Sequence length"
+    ),
+    _ArgSpec(
+        "training.context_len",
+        type=int,
+        default=2048,
+        help="Max length allowed for each sequence",
+    ),
+    _ArgSpec(
+        "training.varlen",
+        action="store_true",
+        help="Whether to take sequences of variable length as input",
+    ),
+    _ArgSpec(
+        "training.gradient_accumulation_steps",
+        type=int,
+        default=1,
+        help="Number of steps to accumulate gradients before updating parameters",
+    ),
+    _ArgSpec(
+        "training.steps",
+        type=int,
+        default=10000,
+        help="How many train steps to run",
+    ),
+    _ArgSpec(
+        "training.max_norm",
+        type=float,
+        default=1.0,
+        help="Max norm for gradient clipping",
+    ),
+    _ArgSpec(
+        "training.skip_nan_inf",
+        action="store_true",
+        help="Skip batch updates when NaN or INF gradients are encountered during training",
+    ),
+    _ArgSpec(
+        "training.dataset",
+        default="HuggingFaceFW/fineweb-edu",
+        help="Dataset to use, with comma separated values",
+    ),
+    _ArgSpec(
+        "training.dataset_name",
+        default=None,
+        help="The name of the dataset config, with comma separated values if provided",
+    ),
+    _ArgSpec(
+        "training.dataset_split",
+        default=None,
+        help="Dataset split to use, with comma separated values if provided",
+    ),
+    _ArgSpec(
+        "training.data_dir",
+        default=None,
+        help="Data dirs to use, with comma separated values if provided",
+    ),
+    _ArgSpec(
+        "training.data_files",
+        default=None,
+        help="Data files to use, with comma separated values if provided",
+    ),
+    _ArgSpec(
+        "training.data_probs",
+        default=None,
+        help="Data sampling probabilities, with comma separated values if provided",
+    ),
+    _ArgSpec(
+        "training.streaming",
+        action="store_true",
+        help="Whether to load dataset in streaming mode, used for huge dataset",
+    ),
+    _ArgSpec(
+        "training.num_workers",
+        type=int,
+        default=32,
+        help="Number of subprocesses to use for data loading. 0 means that the data will be loaded in the main process.",
+    ),
+    _ArgSpec(
+        "training.prefetch_factor",
+        type=int,
+        default=2,
+        help="Number of batches loaded in advance by each worker."
+        "2 means there will be a total of 2 * num_workers batches prefetched across all workers.",
+    ),
+    _ArgSpec(
+        "training.data_parallel_replicate_degree",
+        type=int,
+        default=1,
+        help="""
+        The `data_parallel_replicate_degree` argument specifies the degree of
+        data parallelism for weight replication. When this value is greater
+        than 1, weights will be replicated across `data_parallel_replicate_degree`
+        ranks. If `data_parallel_shard_degree` is also greater than 1, the parallelism
+        method used is HSDP (Hybrid Sharded Data Parallelism). Otherwise, the
+        parallelism method used is DDP (Distributed Data Parallelism).
+        1 means disabled.""",
+    ),
+    _ArgSpec(
+        "training.data_parallel_shard_degree",
+        type=int,
+        default=-1,
+        help="""
+        The `data_parallel_shard_degree` argument specifies the degree of data
+        parallelism for weight sharding. When this value is greater than 1, weights
+        will be sharded across `data_parallel_shard_degree` ranks. If
+        `data_parallel_replicate_degree` is also greater than 1, the parallelism
+        method used is HSDP (Hybrid Sharded Data Parallelism).  Otherwise, the
+        parallelism method used is FSDP (Fully Sharded Data Parallelism).
+
+        -1 means leftover ranks will be used (After DP_REPLICATE/SP/PP). Note that
+        only `data_parallel_shard_degree` can be negative. 1 means disabled.""",
+    ),
+    _ArgSpec(
+        "training.enable_cpu_offload",
+        action="store_true",
+        help="""
+        Whether to apply CPU offloading of parameters, gradients, and optimizer states in FSDP""",
+    ),
+    _ArgSpec(
+        "training.tensor_parallel_degree",
+        type=int,
+        default=1,
+        help="Tensor Parallelism degree. 1 means disabled.",
+    ),
+    _ArgSpec(
+        "training.disable_loss_parallel",
+        action="store_true",
+        help="Whether to apply loss parallel when sequence parallel is enabled",
+    ),
+    _ArgSpec(
+        "training.fsdp_reshard_after_forward",
+        type=str,
+        default="default",
+        choices=_FSDP_RESHARD_CHOICES,
+        help="""
+        `reshard_after_forward` specifies the policy for applying `reshard_after_forward`
+        within an FSDP setup. `reshard_after_forward` controls parameter behavior after forward,
+        trading off memory and communication. See torch's `fully_shard` API for more documentation
+        on `reshard_after_forward`.
+        The supported policies include "default", "always" and "never":
+        - "default" applies default resharding behavior, implementing "smart defaults" for known optimal
+          scenarios.
+        - "always" will enable `reshard_after_forward` for all forward passes.
+        - "never" will disable `reshard_after_forward` for all forward passes.
+        """,
+    ),
+    _ArgSpec(
+        "training.mixed_precision_param",
+        type=str,
+        default="bfloat16",
+        choices=_MP_PARAM_CHOICES,
+        help="""
+            torch dtype to use for parameters when applying mixed precision via fully_shard or torch.autocast.
+            This feature takes effect via fully_shard when data_parallel_shard_degree > 1 or
+            context_parallel_degree > 1; it takes effect via torch.autocast when data_replicate_degree >= 1
+            and no other parallelism is enabled, i.e. under DDP or single-device training.
+        """,
+    ),
+    _ArgSpec(
+        "training.mixed_precision_reduce",
+        type=str,
+        default="float32",
+        choices=_MP_REDUCE_CHOICES,
+        help="""
+            torch dtype to use for reductions when applying mixed precision via FSDP.
+            This feature only takes effect when data_parallel_shard_degree > 1
+        """,
+    ),
+    _ArgSpec(
+        "training.compile",
+        action="store_true",
+        help="Whether to compile the model",
+    ),
+    _ArgSpec(
+        "training.gc_freq",
+        type=int,
+        default=50,
+        help="Python garbage control scheduling interval, in steps",
+    ),
+    _ArgSpec(
+        "training.seed",
+        type=int,
+        default=42,
+        help="Choose the base RNG seed used for training",
+    ),
+    _ArgSpec(
+        "training.deterministic",
+        action="store_true",
+        help="Use deterministic algorithms wherever possible, may be slower",
+    ),
+    # metrics configs
+    _ArgSpec(
+        "metrics.log_freq",
+        type=int,
+        default=10,
+        help="How often to log metrics to TensorBoard, in iterations",
+    ),
+    _ArgSpec(
+        "metrics.enable_tensorboard",
+        action="store_true",
+        help="Whether to log metrics to TensorBoard",
+    ),
+    _ArgSpec(
+        "metrics.disable_color_printing",
+        action="store_true",
+        help="Whether to disable color printing in logs",
+    ),
+    _ArgSpec(
+        "metrics.save_tb_folder",
+        type=str,
+        default="tb",
+        help="Folder to dump TensorBoard states",
+    ),
+    _ArgSpec(
+        "metrics.save_for_all_ranks",
+        action="store_true",
+        default=False,
+        help="""
+            Whether to save TensorBoard/Wandb metrics only for rank 0 or for all ranks.
+            When this option is False and pipeline_parallel_degree is > 1, the metrics
+            component uses the 0th rank of the last stage pipeline group, which is the
+            only stage that computes loss metrics.
+        """,
+    ),
+    _ArgSpec(
+        "metrics.enable_wandb",
+        action="store_true",
+        help="Whether to log metrics to Weights & Biases",
+    ),
+
+    _ArgSpec(
+        "experimental.enable_async_tensor_parallel",
+        action="store_true",
+        help="Whether to apply async tensor parallel (currently only effective when compile is enabled)",
+    ),
+    _ArgSpec(
+        "experimental.pipeline_parallel_degree",
+        type=int,
+        default=1,
+        help="""
+            Pipeline Parallelism degree, or number of ranks. 1 means disabled.
+            If using looped schedules, this still specifies the number of physical ranks, not the number
+            of stages.  Stages per rank are inferred from split points degree, and schedule.""",
+    ),
+    _ArgSpec(
+        "experimental.pipeline_parallel_split_points",
+        type=string_list,
+        nargs="+",
+        default=[],
+        help="""
+            Specify comma-separated names of modules to use as the beginning of a split point.
+
+            e.g. "layers.0,layers.2" will cause the model to be split into 3 stages,
+            the first containing all the layers up to layers.0,
+            the second containing layers.0 and up to layers.2,
+            the third containing layers.2 and all the remaining layers.
+
+            Note: fully-automated splitting may be enabled in the future,
+            but currently the split points must be specified manually.""",
+    ),
+    _ArgSpec(
+        "experimental.pipeline_parallel_schedule",
+        type=str,
+        default="1F1B",
+        help="""
+            Specify the Pipeline Parallel schedule to use. The supported schedules are:
+            https://github.com/pytorch/pytorch/blob/de4c2a3b4e89d96334dc678d1c3f2ae51a6630a0/torch/distributed/pipelining/schedules.py#L2161.
+            The schedule must be compatible with the split points and stages_per_rank.
+
+            Looped schedules (e.g. Interleaved1F1B) require specifying pipeline_parallel_degree = number of ranks,
+            and split_points = number of stages - 1
+            """,
+    ),
+    _ArgSpec(
+        "experimental.pipeline_parallel_schedule_csv",
+        type=str,
+        default="",
+        help="""
+            Specify the path to the pipeline parallel schedule csv file to use.
+            The pipeline_parallel_schedule argument must be either
+            PipelineScheduleSingle, PipelineScheduleMulti, or _PipelineScheduleRuntime.
+        """,
+    ),
+
+    _ArgSpec(
+        "experimental.pipeline_parallel_microbatches",
+        type=int,
+        default=None,
+        help="""
+            How many microbatches to split the global training batch into when using pipeline parallelism.
+
+            The global training batch size must be evenly divisible by the number of microbatches.
+
+            The default value will be the number of pipeline stages, if unspecified.
+        """,
+    ),
+    _ArgSpec(
+        "experimental.enable_compiled_autograd",
+        action="store_true",
+        help="Enable CompiledAutograd to compile the backward.",
+    ),
+    _ArgSpec(
+        "experimental.context_parallel_degree",
+        type=int,
+        default=1,
+        help="Context parallelism degree. 1 means disabled.",
+    ),
+    _ArgSpec(
+        "experimental.context_parallel_rotate_method",
+        type=str,
+        default="allgather",
+        help="""
+            The collective to use in context parallel SDPA for kv shards exchange.
+
+            'allgather' means to all-gather all kv shards on ranks after the first sub-SDPA computation,
+
+            'alltoall' means to all-to-all shuffle the kv shards.
+
+            The default value is 'allgather'.
+        """,
+    ),
+    # I'm not particularly fond of this. Users can choose to write their own wrapper
+    # module and import TorchTitan training loop and execute it, which look cleaner.
+    # One reason to provide this option is to allow users to use the existing run script.
+    # While the script is pretty trivial now, we may add more logic when integrating
+    # with TorchFT.
+    # This option is subject to change and may be deleted in the future.
+    _ArgSpec(
+        "experimental.custom_model_path",
+        type=str,
+        default="",
+        help="""
+            The --custom_model_path option allows to specify a custom path to a model module
+            that is not natively implemented within TorchTitan.
+            Acceptable values are the file system path to the module (e.g., my_models/model_x)
+            dotted import module  (e.g., some_package.model_x).
+        """,
+    ),
+    # checkpointing configs
+    _ArgSpec(
+        "checkpoint.enable_checkpoint",
+        action="store_true",
+        help="Whether to enable checkpoint",
+    ),
+    _ArgSpec(
+        "checkpoint.folder",
+        type=str,
+        default="checkpoint",
+        help="""
+            The folder to store the checkpoints.
+            When enable_checkpoint is set to true, checkpoints will be in {--job.dump_folder}/{--checkpoint.folder}.
+        """,
+    ),
+    _ArgSpec(
+        "checkpoint.initial_load_path", type=str, default=None,
+        help="""
+            This option specifies the path to the initial checkpoint to load, which is
+            particularly useful for resuming training from a previous run with a
+            different output path or when loading a checkpoint from a pre-trained model.
+            If the checkpoint folder for the current run is not empty,
+            located at {--job.dump_folder}/{--checkpoint.folder}, this option will be ignored.
+            This feature allows users to load an initial checkpoint from a different folder and
+            continue training, saving new checkpoints to the specified folder without affecting
+            the existing ones.
+
+            Note that the path should contain the full path to the checkpoint folder,
+            including the step number, if any; for example,
+            "//pre_train/checkpoints/llama3/llama3_8b/step_10000".
+            """
+    ),
+    _ArgSpec(
+        "checkpoint.initial_load_model_weights_only",
+        dest='checkpoint.initial_load_model_weights_only', action="store_true", default=True,
+        help="""
+            This option specifies if only the model weights should be loaded during the initial
+            checkpoint load. The option is only used when `initial_load_path` is specified, and
+            only applies to a model_weights_only checkpoint. Loading a periodic checkpoint 
+            may lead to unexpected behavior if this option is set to True.
+            If False, the checkpoint at `initial_load_path` is treated as a standard training
+            checkpoint, including optimizer and training states.
+            The default setting for this option is True. Note that you will have to use
+            `--checkpoint.no_initial_load_model_weights_only` to override the default setting.
+        """
+    ),
+    _ArgSpec(
+        "checkpoint.no_initial_load_model_weights_only",
+        dest='checkpoint.initial_load_model_weights_only', action="store_false",
+    ),
+    _ArgSpec(
+        "checkpoint.interval",
+        type=int,
+        default=500,
+        help="Checkpointing interval in steps.",
+    ),
+    _ArgSpec(
+        "checkpoint.last_save_model_weights_only",
+        action="store_true",
+        help="""
+            When last_save_model_weights_only=True, only model weights will be saved at the end of training,
+            the last save.  With this, checkpoints can be loaded using `torch.load(..., weights_only=True)`
+            after conversion.  When last_save_model_weights_only=False, the full checkpoint will be saved.
+            A full checkpoint includes model, optimizer and train_state, which can be used to resume training.
+            The default value is false.
+        """,
+    ),
+    _ArgSpec(
+        "checkpoint.export_dtype",
+        type=str,
+        default="float32",
+        choices=_EXPORT_DTYPE_CHOICES,
+        help="""
+            Converts to the specified precision when training completes and model_weights_only=true.
+            Currently supports float32, float16, and bfloat16.
+            The default value is float32.
+        """,
+    ),
+    _ArgSpec(
+        "checkpoint.create_seed_checkpoint",
+        action="store_true",
+        help="""
+            Initializes the full model without applying parallelisms, and then saves it as a seed checkpoint.
+            Note: requires user to call train.py without specifying any parallelisms, e.g. NGPU=1.
+            Could be implemented as a separate script, but this way shares more code.
+        """,
+    ),
+    _ArgSpec(
+        "checkpoint.async_mode",
+        type=str,
+        default="disabled",
+        help="""
+            Which async checkpoint mode to use. Currently there are 3 different modes.
+            1. "disabled": synchronized checkpointing will be used.
+            2. "async": torch.distributed.checkpoint.async_save will be used.
+            3. "async_with_pinned_mem": this option utilizes a dedicated pinned memory
+               space and creates a separate process for faster GPU->CPU transfer
+               performance and eliminating GIL contention. The cost is increased CPU
+               memory usage. If insufficient CPU memory is available, performance may
+               degrade due to memory paging. For most users, "async" should suffice as
+               the performance overhead is typically small (on the order of tens of
+               seconds) compared to checkpointing frequency. This mode can be employed
+               to pursue near-zero checkpointing times (e.g., < 1 second) given
+               appropriate hardware support such as ample CPU memory and fast PCIe.
+
+            "disabled" is the default mode.
+        """,
+    ),
+    _ArgSpec(
+        "checkpoint.keep_latest_k",
+        type=int,
+        default=0,
+        help="""
+            Keeps only the latest k checkpoints, and purging older ones. If 0, keep all checkpoints.
+            0 is the default value. k cannot be 1 as the last one may be in the process of being
+            saved. As a result, the metadata of the last one may not be ready yet.
+        """,
+    ),
+    _ArgSpec(
+        "checkpoint.load_step",
+        type=int,
+        default=-1,
+        help="Load the checkpoint at the specified step. If -1, load the latest checkpoint.",
+    ),
+    _ArgSpec(
+        "checkpoint.exclude_from_loading",
+        type=string_list,
+        nargs="*",
+        default=[],
+        help="""
+            Exclude specific keys from being loaded from the checkpoint.
+            Provide a comma-separated list of keys to exclude, e.g. 'optimizer,lr_scheduler,dataloader'.
+            This will load the model only, excluding the specified keys.
+        """,
+    ),
+    # activation checkpointing configs
+    _ArgSpec(
+        "activation_checkpoint.mode",
+        type=str,
+        default="selective",
+        help="Type of activation checkpointing to use ['none', 'full', 'selective']",
+    ),
+    _ArgSpec(
+        "activation_checkpoint.selective_ac_option",
+        type=str,
+        default="2",  # 2 = checkpoint every other layer
+        help="""
+            Selective activation checkpointing options ['int', 'op'].
+            'int' (e.g., 2) for every nth layer, or 'op' for op level ac.
+        """,
+    ),
+
+    _ArgSpec(
+        "activation_offload.mode",
+        type=str,
+        default="none",
+        help="""
+            if we are using activation offload or not. Options are ['none', 'full'].
+        """,
+    ),
+
+    # float8 configs
+    _ArgSpec(
+        "float8.enable_fsdp_float8_all_gather",
+        action="store_true",
+        help="Whether enable float8 all-gather in FSDP, recommended for tensorwise scaling",
+    ),
+    _ArgSpec(
+        "float8.precompute_float8_dynamic_scale_for_fsdp",
+        action="store_true",
+        help="Whether precompute float8 scales dynamically for FSDP, recommended for tensorwise scaling",
+    ),
+    _ArgSpec(
+        "float8.force_recompute_fp8_weight_in_bwd",
+        action="store_true",
+        help="""
+        Whether to force the recomputation of FP8 weights during backward pass.
+        When using FSDP with tensorwise scaling, it is recommended to enable
+        `force_recompute_fp8_weight_in_bwd` to prevent saving unsharded FP8 weights
+        for backward computation.
+        """,
+    ),
+    _ArgSpec(
+        "float8.recipe_name",
+        type=str,
+        default=None,
+        choices=_FLOAT8_RECIPE_CHOICES,
+        help="""
+        If specified, creates float8 config from recipe name, valid choices are
+        `tensorwise`, `rowwise` and `rowwise_with_gw_hp`.
+        """,
+    ),
+
+    # communications library settings
+    _ArgSpec(
+        "comm.init_timeout_seconds",
+        type=int,
+        default=300,
+        help="Timeout for communication operations, during initialization and first train step.",
+    ),
+    _ArgSpec(
+        "comm.train_timeout_seconds",
+        type=int,
+        default=100,
+        help=(
+            "Timeout for communication operations after the first train step -- "
+            "usually a tighter bound than during initialization."
+        ),
+    ),
+    _ArgSpec(
+        "comm.trace_buf_size",
+        type=int,
+        default=20000,
+        help="Flight recorder ring buffer size, >0 means recording by default, 0 means disabled",
+    ),
+
+    # memory estimation settings
+    _ArgSpec(
+        "memory_estimation.enabled",
+        help="Whether to estimate memory usage for FSDP",
+        action="store_true",
+    ),
+
+    _ArgSpec(
+        "memory_estimation.disable_fake_mode",
+        help="Whether to estimate memory under FakeTensorMode",
+        action="store_true",
+    ),
+
+    _ArgSpec(
+        "fault_tolerance.enable",
+        action="store_true",
+        help="""
+            Enable TorchFT integration. When TorchFT is enabled, HSDP will be used.
+            And --fault_tolerance.data_parallel_replicate_degree should be 1 and
+            --fault_tolerance.group_size will be used to control the maximum
+            replicate group size as the replicate group size is dynamic.
+
+            Note that this is still an experimental feature.
+        """,
+    ),
+
+    _ArgSpec(
+        "fault_tolerance.replica_id",
+        type=int,
+        default=0,
+        help="The TorchFT replica ID of this run.",
+    ),
+
+    _ArgSpec(
+        "fault_tolerance.group_size",
+        type=int,
+        default=0,
+        help="""
+            The number of TorchFT replicate groups. This number will be used for
+            dataloader to split the dataset across the replicate groups and FSDP
+            dimension
+        """,
+    ),
+
+    _ArgSpec(
+        "fault_tolerance.min_replica_size",
+        type=int,
+        default=1,
+        help="The minimum number of FT replica for each step.",
+    ),
+)
+
+
+@functools.lru_cache(maxsize=1)
+def _build_parser() -> argparse.ArgumentParser:
+    """
+    Build the argument parser shared by all `JobConfig` instances.
+    Parsing does not mutate the parser, so it is built once per process.
+    """
+    parser = _ArgumentParser(description="torchtitan arg parser.")
+
+    # help texts are only used by --help, yet recent Python versions validate them in every `add_argument`;
+    # non-interactive jobs can skip them with FLAME_NO_HELP=1, the options are still listed by --help
+    skipped = ("help",) if os.environ.get("FLAME_NO_HELP") == "1" else ()
+    for spec in _ARG_SPECS:
+        kwargs = {k: v for k, v in zip(spec._fields[1:], spec[1:]) if v is not _UNSET and k not in skipped}
+        parser.add_argument(f"--{spec.name}", **kwargs)
+
+    return parser
+
+
+def _argname_keys(parser: argparse.ArgumentParser) -> MappingProxyType:
+    """Get the mapping from each parser argument name to its (section, name) keys."""
+    return MappingProxyType({
+        action.dest: tuple(action.dest.split(".", 1)) for action in parser._actions if action.dest != "help"
+    })
+
+
+def _string_list_argnames(parser: argparse.ArgumentParser) -> frozenset[str]:
+    """Get the parser argument names of type `string_list`."""
+    return frozenset(action.dest for action in parser._actions if action.type is string_list)
+
+
+def _string_list_args(parser: argparse.ArgumentParser) -> MappingProxyType:
+    """Get the names of the parser arguments of type `string_list`, grouped by section."""
+    argname_keys = _argname_keys(parser)
+    args_by_section = defaultdict(list)
+    for argname in _string_list_argnames(parser):
+        section, name = argname_keys[argname]
+        args_by_section[section].append(name)
+    return MappingProxyType({k: tuple(v) for k, v in args_by_section.items()})
+
+
+def _merge_toml_section(sec: dict[str, any], values: dict[str, any], string_list_names: tuple[str, ...]):
+    # to prevent overwrite of non-specified keys
+    sec |= values
+    # Checking string-list arguments are properly split into a list.
+    # Only the toml values may still be raw strings, those from the cmd line
+    # have already been parsed into a list by the parser.
+    for name in string_list_names:
+        value = values.get(name)
+        if type(value) is str:
+            sec[name] = string_list(value)
+
+
+def _default_args(parser: argparse.ArgumentParser) -> MappingProxyType:
+    """Get the read-only two level dict of the parser defaults, resolved as argparse would."""
+    argname_keys = _argname_keys(parser)
+    args_dict = defaultdict(dict)
+    for action in parser._actions:
+        if action.dest not in argname_keys or action.default is argparse.SUPPRESS:
+            continue
+        first_level_key, second_level_key = argname_keys[action.dest]
+        # the first argument declared for a dest provides its default
+        if second_level_key in args_dict[first_level_key]:
+            continue
+        default = action.default
+        if isinstance(default, str):
+            default = parser._get_value(action, default)
+        args_dict[first_level_key][second_level_key] = default
+    return MappingProxyType({k: MappingProxyType(v) for k, v in args_dict.items()})
+
+
+_ParserTables = namedtuple("_ParserTables", ["argname_keys", "string_list_argnames", "string_list_args", "default_args"])
+
+
+def _parser_tables(parser: argparse.ArgumentParser) -> _ParserTables:
+    """Get the lookup tables derived from the actions of `parser`."""
+    return _ParserTables(
+        _argname_keys(parser), _string_list_argnames(parser), _string_list_args(parser), _default_args(parser)
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _shared_parser_tables() -> _ParserTables:
+    """Get the lookup tables of the shared parser, which never changes once built."""
+    return _parser_tables(_build_parser())
+
+
+@functools.lru_cache(maxsize=None)
+def _section_type(name: str, keys: tuple[str, ...]) -> type:
+    """
+    Get the `__slots__` class of a config section, shared by all sections with the same keys.
+    The section keys are read through their slots, while `__dict__` still accepts new attributes.
+    Sections are thus instances of one such class per section name and keys, not of a single common type.
+    """
+    return type(name.title(), (), {"__slots__": keys + ("__dict__",)})
+
+
+def _build_section(name: str, values: dict[str, any]):
+    keys = tuple(values)
+    if not all(k.isidentifier() for k in keys):
+        # toml keys that are not valid python names cannot be slots
+        return SimpleNamespace(**values)
+    section = _section_type(name, keys)()
+    for k, v in values.items():
+        setattr(section, k, v)
+    return section
+
+
 class JobConfig:
     """
     A helper class to manage the train configuration.
@@ -64,859 +1097,101 @@ class JobConfig:
     in the toml file
     """
 
+    __slots__ = ("args_dict", "_resolved", "_parser")
+
     def __init__(self):
         self.args_dict = None
-        # main parser
-        self.parser = argparse.ArgumentParser(description="torchtitan arg parser.")
-
-        self.parser.add_argument(
-            "--job.config_file",
-            type=str,
-            default=None,
-            help="Job config file",
-        )
-
-        # job level configs
-        self.parser.add_argument(
-            "--job.dump_folder",
-            type=str,
-            default="./torchtitan/outputs",
-            help="Folder to dump job outputs",
-        )
-        self.parser.add_argument(
-            "--job.description",
-            type=str,
-            default="default job",
-            help="Description of the job",
-        )
-        self.parser.add_argument(
-            "--job.use_for_integration_test",
-            action="store_true",
-            help="Add this config to the integration test suite",
-        )
-        self.parser.add_argument(
-            "--job.print_args",
-            action="store_true",
-            help="Print the args to terminal",
-        )
-
-        # model configs
-        self.parser.add_argument(
-            "--model.name",
-            type=str,
-            default="fla",
-            help="Which model to train",
-        )
-        self.parser.add_argument(
-            "--model.config",
-            type=str,
-            default="fla-hub/transformer-1.3B-100B",
-            help="Path to the model config",
-        )
-        self.parser.add_argument(
-            "--model.tokenizer_path",
-            type=str,
-            default="fla-hub/transformer-1.3B-100B",
-            help="Tokenizer path",
-        )
-        self.parser.add_argument(
-            "--model.converters",
-            type=string_list,
-            nargs="+",
-            default=[],
-            help="""
-                Comma separated list of converters to apply to the model.
-                For instance, the `float8` converter swaps `torch.nn.Linear`
-                with `Float8Linear`. This feature requires you to install 'torchao'
-                which can be found here: https://github.com/pytorch/ao
-            """,
-        )
-        self.parser.add_argument(
-            "--model.print_after_conversion",
-            action="store_true",
-            help="""
-            If true, model definition will be printed to stdout after all model
-            converters have been applied.
-            """,
-        )
-
-        # profiling configs
-        self.parser.add_argument(
-            "--profiling.enable_profiling",
-            action="store_true",
-            help="Whether to enable pytorch profiler",
-        )
-        self.parser.add_argument(
-            "--profiling.save_traces_folder",
-            type=str,
-            default="profile_traces",
-            help="Trace files location",
-        )
-        self.parser.add_argument(
-            "--profiling.profile_freq",
-            type=int,
-            default=10,
-            help="How often to collect profiler traces, in iterations",
-        )
-        self.parser.add_argument(
-            "--profiling.enable_memory_snapshot",
-            action="store_true",
-            help="Whether to dump memory snapshot",
-        )
-        self.parser.add_argument(
-            "--profiling.save_memory_snapshot_folder",
-            type=str,
-            default="memory_snapshot",
-            help="Memeory snapshot files location",
-        )
-
-        # optimizer configs
-        self.parser.add_argument(
-            "--optimizer.name", type=str, default="AdamW", help="Optimizer to use"
-        )
-        self.parser.add_argument(
-            "--optimizer.eps",
-            type=float,
-            default=1e-8,
-            help="Epsilon value for the optimizer.",
-        )
-        self.parser.add_argument(
-            "--optimizer.lr", type=float, default=8e-4, help="Learning rate to use"
-        )
-        self.parser.add_argument(
-            "--optimizer.beta1", type=float, default=0.9,
-            help="Exponential moving average hyperparameters to use"
-        )
-        self.parser.add_argument(
-            "--optimizer.beta2", type=float, default=0.95,
-            help="Exponential moving average hyperparameters to use"
-        )
-        self.parser.add_argument(
-            "--optimizer.weight_decay", type=float, default=0.1,
-            help="Weight decay to use"
-        )
-        self.parser.add_argument(
-            "--optimizer.implementation",
-            type=str,
-            default="fused",
-            choices=["for-loop", "foreach", "fused"],
-            help="""
-            Specify which optimizer implementation to use:
-            - 'fused': Use fused implementation (CUDA only) for best performance.
-            - 'foreach': Use some horizontal fusion of tensors for better performance.
-            - 'for-loop': Use the default implementation for the optimizer (slowest).
-            - more info: https://pytorch.org/docs/stable/optim.html
-            """,
-        )
-        self.parser.add_argument(
-            "--optimizer.early_step_in_backward",
-            action="store_true",
-            help="""
-            Whether to apply optimizer in the backward. Caution, optimizer_in_backward
-            is not compatible with gradients clipping, users should not call
-            register_post_accumulate_grad_hook after the optimizer is built.""",
-        )
-
-        # lr scheduler configs
-        self.parser.add_argument(
-            "--lr_scheduler.warmup_steps",
-            type=int,
-            default=200,
-            help="Steps for lr scheduler warmup, normally 1/5 of --training.steps",
-        )
-        self.parser.add_argument(
-            "--lr_scheduler.decay_ratio",
-            type=float,
-            default=None,
-            help="""
-            Controls the proportion of the training steps allocated to the learning rate decay phase.
-
-            If `None`, the learning rate will begin decaying immediately after the warmup period.
-            Otherwise, the learning rate will remain stable after the warmup period and
-            only start decaying during the last `decay_ratio` portion of the total training steps.
-
-            This is known as the Warmup-Stable-Decay (WSD) schedule, as described in https://arxiv.org/abs/2404.06395.
-            """,
-        )
-        self.parser.add_argument(
-            "--lr_scheduler.decay_type",
-            type=str,
-            default="linear",
-            choices=["linear", "sqrt", "cosine"],
-            help="""
-            Learning rate decay type to use during training:
-            - 'linear': linearly decays learning rate from initial to final value
-            - 'sqrt': decays learning rate following a 1 minus square root curve
-            - 'cosine': smoothly decays learning rate following a cosine curve
-            """,
-        )
-        self.parser.add_argument(
-            "--lr_scheduler.lr_min",
-            type=float,
-            default=0.0,
-            help="""
-            Min lr ratio for lr scheduler.
-
-            If provided, the range of decay factor is scaled from 1 to `lr_min`
-            to ensure the learning rate does not drop below `optimizer.lr * lr_scheduler.lr_min`.
-            """,
-        )
-
-        # training configs
-        self.parser.add_argument(
-            "--training.batch_size", type=int, default=8, help="Batch size"
-        )
-        self.parser.add_argument(
-            "--training.seq_len", type=int, default=2048, help="Sequence length"
-        )
-        self.parser.add_argument(
-            "--training.context_len",
-            type=int,
-            default=2048,
-            help="Max length allowed for each sequence",
-        )
-        self.parser.add_argument(
-            "--training.varlen",
-            action="store_true",
-            help="Whether to take sequences of variable length as input",
-        )
-        self.parser.add_argument(
-            "--training.gradient_accumulation_steps",
-            type=int,
-            default=1,
-            help="Number of steps to accumulate gradients before updating parameters",
-        )
-        self.parser.add_argument(
-            "--training.steps",
-            type=int,
-            default=10000,
-            help="How many train steps to run",
-        )
-        self.parser.add_argument(
-            "--training.max_norm",
-            type=float,
-            default=1.0,
-            help="Max norm for gradient clipping",
-        )
-        self.parser.add_argument(
-            "--training.skip_nan_inf",
-            action="store_true",
-            help="Skip batch updates when NaN or INF gradients are encountered during training",
-        )
-        self.parser.add_argument(
-            "--training.dataset",
-            default="HuggingFaceFW/fineweb-edu",
-            help="Dataset to use, with comma separated values",
-        )
-        self.parser.add_argument(
-            "--training.dataset_name",
-            default=None,
-            help="The name of the dataset config, with comma separated values if provided",
-        )
-        self.parser.add_argument(
-            "--training.dataset_split",
-            default=None,
-            help="Dataset split to use, with comma separated values if provided",
-        )
-        self.parser.add_argument(
-            "--training.data_dir",
-            default=None,
-            help="Data dirs to use, with comma separated values if provided",
-        )
-        self.parser.add_argument(
-            "--training.data_files",
-            default=None,
-            help="Data files to use, with comma separated values if provided",
-        )
-        self.parser.add_argument(
-            "--training.data_probs",
-            default=None,
-            help="Data sampling probabilities, with comma separated values if provided",
-        )
-        self.parser.add_argument(
-            "--training.streaming",
-            action="store_true",
-            help="Whether to load dataset in streaming mode, used for huge dataset",
-        )
-        self.parser.add_argument(
-            "--training.num_workers",
-            type=int,
-            default=32,
-            help="Number of subprocesses to use for data loading. 0 means that the data will be loaded in the main process.",
-        )
-        self.parser.add_argument(
-            "--training.prefetch_factor",
-            type=int,
-            default=2,
-            help="Number of batches loaded in advance by each worker."
-            "2 means there will be a total of 2 * num_workers batches prefetched across all workers.",
-        )
-        self.parser.add_argument(
-            "--training.data_parallel_replicate_degree",
-            type=int,
-            default=1,
-            help="""
-            The `data_parallel_replicate_degree` argument specifies the degree of
-            data parallelism for weight replication. When this value is greater
-            than 1, weights will be replicated across `data_parallel_replicate_degree`
-            ranks. If `data_parallel_shard_degree` is also greater than 1, the parallelism
-            method used is HSDP (Hybrid Sharded Data Parallelism). Otherwise, the
-            parallelism method used is DDP (Distributed Data Parallelism).
-            1 means disabled.""",
-        )
-        self.parser.add_argument(
-            "--training.data_parallel_shard_degree",
-            type=int,
-            default=-1,
-            help="""
-            The `data_parallel_shard_degree` argument specifies the degree of data
-            parallelism for weight sharding. When this value is greater than 1, weights
-            will be sharded across `data_parallel_shard_degree` ranks. If
-            `data_parallel_replicate_degree` is also greater than 1, the parallelism
-            method used is HSDP (Hybrid Sharded Data Parallelism).  Otherwise, the
-            parallelism method used is FSDP (Fully Sharded Data Parallelism).
-
-            -1 means leftover ranks will be used (After DP_REPLICATE/SP/PP). Note that
-            only `data_parallel_shard_degree` can be negative. 1 means disabled.""",
-        )
-        self.parser.add_argument(
-            "--training.enable_cpu_offload",
-            action="store_true",
-            help="""
-            Whether to apply CPU offloading of parameters, gradients, and optimizer states in FSDP""",
-        )
-        self.parser.add_argument(
-            "--training.tensor_parallel_degree",
-            type=int,
-            default=1,
-            help="Tensor Parallelism degree. 1 means disabled.",
-        )
-        self.parser.add_argument(
-            "--training.disable_loss_parallel",
-            action="store_true",
-            help="Whether to apply loss parallel when sequence parallel is enabled",
-        )
-        self.parser.add_argument(
-            "--training.fsdp_reshard_after_forward",
-            type=str,
-            default="default",
-            choices=["default", "always", "never"],
-            help="""
-            `reshard_after_forward` specifies the policy for applying `reshard_after_forward`
-            within an FSDP setup. `reshard_after_forward` controls parameter behavior after forward,
-            trading off memory and communication. See torch's `fully_shard` API for more documentation
-            on `reshard_after_forward`.
-            The supported policies include "default", "always" and "never":
-            - "default" applies default resharding behavior, implementing "smart defaults" for known optimal
-              scenarios.
-            - "always" will enable `reshard_after_forward` for all forward passes.
-            - "never" will disable `reshard_after_forward` for all forward passes.
-            """,
-        )
-        self.parser.add_argument(
-            "--training.mixed_precision_param",
-            type=str,
-            default="bfloat16",
-            choices=["bfloat16", "float32"],
-            help="""
-                torch dtype to use for parameters when applying mixed precision via fully_shard or torch.autocast.
-                This feature takes effect via fully_shard when data_parallel_shard_degree > 1 or
-                context_parallel_degree > 1; it takes effect via torch.autocast when data_replicate_degree >= 1
-                and no other parallelism is enabled, i.e. under DDP or single-device training.
-            """,
-        )
-        self.parser.add_argument(
-            "--training.mixed_precision_reduce",
-            type=str,
-            default="float32",
-            choices=["float32"],
-            help="""
-                torch dtype to use for reductions when applying mixed precision via FSDP.
-                This feature only takes effect when data_parallel_shard_degree > 1
-            """,
-        )
-        self.parser.add_argument(
-            "--training.compile",
-            action="store_true",
-            help="Whether to compile the model",
-        )
-        self.parser.add_argument(
-            "--training.gc_freq",
-            type=int,
-            default=50,
-            help="Python garbage control scheduling interval, in steps",
-        )
-        self.parser.add_argument(
-            "--training.seed",
-            type=int,
-            default=42,
-            help="Choose the base RNG seed used for training",
-        )
-        self.parser.add_argument(
-            "--training.deterministic",
-            action="store_true",
-            help="Use deterministic algorithms wherever possible, may be slower",
-        )
-        # metrics configs
-        self.parser.add_argument(
-            "--metrics.log_freq",
-            type=int,
-            default=10,
-            help="How often to log metrics to TensorBoard, in iterations",
-        )
-        self.parser.add_argument(
-            "--metrics.enable_tensorboard",
-            action="store_true",
-            help="Whether to log metrics to TensorBoard",
-        )
-        self.parser.add_argument(
-            "--metrics.disable_color_printing",
-            action="store_true",
-            help="Whether to disable color printing in logs",
-        )
-        self.parser.add_argument(
-            "--metrics.save_tb_folder",
-            type=str,
-            default="tb",
-            help="Folder to dump TensorBoard states",
-        )
-        self.parser.add_argument(
-            "--metrics.save_for_all_ranks",
-            action="store_true",
-            default=False,
-            help="""
-                Whether to save TensorBoard/Wandb metrics only for rank 0 or for all ranks.
-                When this option is False and pipeline_parallel_degree is > 1, the metrics
-                component uses the 0th rank of the last stage pipeline group, which is the
-                only stage that computes loss metrics.
-            """,
-        )
-        self.parser.add_argument(
-            "--metrics.enable_wandb",
-            action="store_true",
-            help="Whether to log metrics to Weights & Biases",
-        )
-
-        self.parser.add_argument(
-            "--experimental.enable_async_tensor_parallel",
-            action="store_true",
-            help="Whether to apply async tensor parallel (currently only effective when compile is enabled)",
-        )
-        self.parser.add_argument(
-            "--experimental.pipeline_parallel_degree",
-            type=int,
-            default=1,
-            help="""
-                Pipeline Parallelism degree, or number of ranks. 1 means disabled.
-                If using looped schedules, this still specifies the number of physical ranks, not the number
-                of stages.  Stages per rank are inferred from split points degree, and schedule.""",
-        )
-        self.parser.add_argument(
-            "--experimental.pipeline_parallel_split_points",
-            type=string_list,
-            nargs="+",
-            default=[],
-            help="""
-                Specify comma-separated names of modules to use as the beginning of a split point.
-
-                e.g. "layers.0,layers.2" will cause the model to be split into 3 stages,
-                the first containing all the layers up to layers.0,
-                the second containing layers.0 and up to layers.2,
-                the third containing layers.2 and all the remaining layers.
-
-                Note: fully-automated splitting may be enabled in the future,
-                but currently the split points must be specified manually.""",
-        )
-        self.parser.add_argument(
-            "--experimental.pipeline_parallel_schedule",
-            type=str,
-            default="1F1B",
-            help="""
-                Specify the Pipeline Parallel schedule to use. The supported schedules are:
-                https://github.com/pytorch/pytorch/blob/de4c2a3b4e89d96334dc678d1c3f2ae51a6630a0/torch/distributed/pipelining/schedules.py#L2161.
-                The schedule must be compatible with the split points and stages_per_rank.
-
-                Looped schedules (e.g. Interleaved1F1B) require specifying pipeline_parallel_degree = number of ranks,
-                and split_points = number of stages - 1
-                """,
-        )
-        self.parser.add_argument(
-            "--experimental.pipeline_parallel_schedule_csv",
-            type=str,
-            default="",
-            help="""
-                Specify the path to the pipeline parallel schedule csv file to use.
-                The pipeline_parallel_schedule argument must be either
-                PipelineScheduleSingle, PipelineScheduleMulti, or _PipelineScheduleRuntime.
-            """,
-        )
-
-        self.parser.add_argument(
-            "--experimental.pipeline_parallel_microbatches",
-            type=int,
-            default=None,
-            help="""
-                How many microbatches to split the global training batch into when using pipeline parallelism.
+        # section objects built from `args_dict` on first access
+        self._resolved = {}
+        # private copy of the shared parser, only made once `parser` is accessed
+        self._parser = None
 
-                The global training batch size must be evenly divisible by the number of microbatches.
-
-                The default value will be the number of pipeline stages, if unspecified.
-            """,
-        )
-        self.parser.add_argument(
-            "--experimental.enable_compiled_autograd",
-            action="store_true",
-            help="Enable CompiledAutograd to compile the backward.",
-        )
-        self.parser.add_argument(
-            "--experimental.context_parallel_degree",
-            type=int,
-            default=1,
-            help="Context parallelism degree. 1 means disabled.",
-        )
-        self.parser.add_argument(
-            "--experimental.context_parallel_rotate_method",
-            type=str,
-            default="allgather",
-            help="""
-                The collective to use in context parallel SDPA for kv shards exchange.
-
-                'allgather' means to all-gather all kv shards on ranks after the first sub-SDPA computation,
-
-                'alltoall' means to all-to-all shuffle the kv shards.
-
-                The default value is 'allgather'.
-            """,
-        )
-        # I'm not particularly fond of this. Users can choose to write their own wrapper
-        # module and import TorchTitan training loop and execute it, which look cleaner.
-        # One reason to provide this option is to allow users to use the existing run script.
-        # While the script is pretty trivial now, we may add more logic when integrating
-        # with TorchFT.
-        # This option is subject to change and may be deleted in the future.
-        self.parser.add_argument(
-            "--experimental.custom_model_path",
-            type=str,
-            default="",
-            help="""
-                The --custom_model_path option allows to specify a custom path to a model module
-                that is not natively implemented within TorchTitan.
-                Acceptable values are the file system path to the module (e.g., my_models/model_x)
-                dotted import module  (e.g., some_package.model_x).
-            """,
-        )
-        # checkpointing configs
-        self.parser.add_argument(
-            "--checkpoint.enable_checkpoint",
-            action="store_true",
-            help="Whether to enable checkpoint",
-        )
-        self.parser.add_argument(
-            "--checkpoint.folder",
-            type=str,
-            default="checkpoint",
-            help="""
-                The folder to store the checkpoints.
-                When enable_checkpoint is set to true, checkpoints will be in {--job.dump_folder}/{--checkpoint.folder}.
-            """,
-        )
-        self.parser.add_argument(
-            "--checkpoint.initial_load_path", type=str, default=None,
-            help="""
-                This option specifies the path to the initial checkpoint to load, which is
-                particularly useful for resuming training from a previous run with a
-                different output path or when loading a checkpoint from a pre-trained model.
-                If the checkpoint folder for the current run is not empty,
-                located at {--job.dump_folder}/{--checkpoint.folder}, this option will be ignored.
-                This feature allows users to load an initial checkpoint from a different folder and
-                continue training, saving new checkpoints to the specified folder without affecting
-                the existing ones.
-            
-                Note that the path should contain the full path to the checkpoint folder,
-                including the step number, if any; for example,
-                "//pre_train/checkpoints/llama3/llama3_8b/step_10000".
-                """
-        )
-        self.parser.add_argument(
-            "--checkpoint.initial_load_model_weights_only",
-            dest='checkpoint.initial_load_model_weights_only', action="store_true", default=True,
-            help="""
-                This option specifies if only the model weights should be loaded during the initial
-                checkpoint load. The option is only used when `initial_load_path` is specified, and
-                only applies to a model_weights_only checkpoint. Loading a periodic checkpoint 
-                may lead to unexpected behavior if this option is set to True.
-                If False, the checkpoint at `initial_load_path` is treated as a standard training
-                checkpoint, including optimizer and training states.
-                The default setting for this option is True. Note that you will have to use
-                `--checkpoint.no_initial_load_model_weights_only` to override the default setting.
-            """
-        )
-        self.parser.add_argument(
-            "--checkpoint.no_initial_load_model_weights_only",
-            dest='checkpoint.initial_load_model_weights_only', action="store_false",
-        )
-        self.parser.add_argument(
-            "--checkpoint.interval",
-            type=int,
-            default=500,
-            help="Checkpointing interval in steps.",
-        )
-        self.parser.add_argument(
-            "--checkpoint.last_save_model_weights_only",
-            action="store_true",
-            help="""
-                When last_save_model_weights_only=True, only model weights will be saved at the end of training,
-                the last save.  With this, checkpoints can be loaded using `torch.load(..., weights_only=True)`
-                after conversion.  When last_save_model_weights_only=False, the full checkpoint will be saved.
-                A full checkpoint includes model, optimizer and train_state, which can be used to resume training.
-                The default value is false.
-            """,
-        )
-        self.parser.add_argument(
-            "--checkpoint.export_dtype",
-            type=str,
-            default="float32",
-            choices=["float16", "bfloat16", "float32"],
-            help="""
-                Converts to the specified precision when training completes and model_weights_only=true.
-                Currently supports float32, float16, and bfloat16.
-                The default value is float32.
-            """,
-        )
-        self.parser.add_argument(
-            "--checkpoint.create_seed_checkpoint",
-            action="store_true",
-            help="""
-                Initializes the full model without applying parallelisms, and then saves it as a seed checkpoint.
-                Note: requires user to call train.py without specifying any parallelisms, e.g. NGPU=1.
-                Could be implemented as a separate script, but this way shares more code.
-            """,
-        )
-        self.parser.add_argument(
-            "--checkpoint.async_mode",
-            type=str,
-            default="disabled",
-            help="""
-                Which async checkpoint mode to use. Currently there are 3 different modes.
-                1. "disabled": synchronized checkpointing will be used.
-                2. "async": torch.distributed.checkpoint.async_save will be used.
-                3. "async_with_pinned_mem": this option utilizes a dedicated pinned memory
-                   space and creates a separate process for faster GPU->CPU transfer
-                   performance and eliminating GIL contention. The cost is increased CPU
-                   memory usage. If insufficient CPU memory is available, performance may
-                   degrade due to memory paging. For most users, "async" should suffice as
-                   the performance overhead is typically small (on the order of tens of
-                   seconds) compared to checkpointing frequency. This mode can be employed
-                   to pursue near-zero checkpointing times (e.g., < 1 second) given
-                   appropriate hardware support such as ample CPU memory and fast PCIe.
-
-                "disabled" is the default mode.
-            """,
-        )
-        self.parser.add_argument(
-            "--checkpoint.keep_latest_k",
-            type=int,
-            default=0,
-            help="""
-                Keeps only the latest k checkpoints, and purging older ones. If 0, keep all checkpoints.
-                0 is the default value. k cannot be 1 as the last one may be in the process of being
-                saved. As a result, the metadata of the last one may not be ready yet.
-            """,
-        )
-        self.parser.add_argument(
-            "--checkpoint.load_step",
-            type=int,
-            default=-1,
-            help="Load the checkpoint at the specified step. If -1, load the latest checkpoint.",
-        )
-        self.parser.add_argument(
-            "--checkpoint.exclude_from_loading",
-            type=string_list,
-            nargs="*",
-            default=[],
-            help="""
-                Exclude specific keys from being loaded from the checkpoint.
-                Provide a comma-separated list of keys to exclude, e.g. 'optimizer,lr_scheduler,dataloader'.
-                This will load the model only, excluding the specified keys.
-            """,
-        )
-        # activation checkpointing configs
-        self.parser.add_argument(
-            "--activation_checkpoint.mode",
-            type=str,
-            default="selective",
-            help="Type of activation checkpointing to use ['none', 'full', 'selective']",
-        )
-        self.parser.add_argument(
-            "--activation_checkpoint.selective_ac_option",
-            type=str,
-            default="2",  # 2 = checkpoint every other layer
-            help="""
-                Selective activation checkpointing options ['int', 'op'].
-                'int' (e.g., 2) for every nth layer, or 'op' for op level ac.
-            """,
-        )
-
-        self.parser.add_argument(
-            "--activation_offload.mode",
-            type=str,
-            default="none",
-            help="""
-                if we are using activation offload or not. Options are ['none', 'full'].
-            """,
-        )
-
-        # float8 configs
-        self.parser.add_argument(
-            "--float8.enable_fsdp_float8_all_gather",
-            action="store_true",
-            help="Whether enable float8 all-gather in FSDP, recommended for tensorwise scaling",
-        )
-        self.parser.add_argument(
-            "--float8.precompute_float8_dynamic_scale_for_fsdp",
-            action="store_true",
-            help="Whether precompute float8 scales dynamically for FSDP, recommended for tensorwise scaling",
-        )
-        self.parser.add_argument(
-            "--float8.force_recompute_fp8_weight_in_bwd",
-            action="store_true",
-            help="""
-            Whether to force the recomputation of FP8 weights during backward pass.
-            When using FSDP with tensorwise scaling, it is recommended to enable
-            `force_recompute_fp8_weight_in_bwd` to prevent saving unsharded FP8 weights
-            for backward computation.
-            """,
-        )
-        self.parser.add_argument(
-            "--float8.recipe_name",
-            type=str,
-            default=None,
-            choices=["tensorwise", "rowwise", "rowwise_with_gw_hp"],
-            help="""
-            If specified, creates float8 config from recipe name, valid choices are
-            `tensorwise`, `rowwise` and `rowwise_with_gw_hp`.
-            """,
-        )
-
-        # communications library settings
-        self.parser.add_argument(
-            "--comm.init_timeout_seconds",
-            type=int,
-            default=300,
-            help="Timeout for communication operations, during initialization and first train step.",
-        )
-        self.parser.add_argument(
-            "--comm.train_timeout_seconds",
-            type=int,
-            default=100,
-            help=(
-                "Timeout for communication operations after the first train step -- "
-                "usually a tighter bound than during initialization."
-            ),
-        )
-        self.parser.add_argument(
-            "--comm.trace_buf_size",
-            type=int,
-            default=20000,
-            help="Flight recorder ring buffer size, >0 means recording by default, 0 means disabled",
-        )
-
-        # memory estimation settings
-        self.parser.add_argument(
-            "--memory_estimation.enabled",
-            help="Whether to estimate memory usage for FSDP",
-            action="store_true",
-        )
-
-        self.parser.add_argument(
-            "--memory_estimation.disable_fake_mode",
-            help="Whether to estimate memory under FakeTensorMode",
-            action="store_true",
-        )
-
-        self.parser.add_argument(
-            "--fault_tolerance.enable",
-            action="store_true",
-            help="""
-                Enable TorchFT integration. When TorchFT is enabled, HSDP will be used.
-                And --fault_tolerance.data_parallel_replicate_degree should be 1 and
-                --fault_tolerance.group_size will be used to control the maximum
-                replicate group size as the replicate group size is dynamic.
-
-                Note that this is still an experimental feature.
-            """,
-        )
-
-        self.parser.add_argument(
-            "--fault_tolerance.replica_id",
-            type=int,
-            default=0,
-            help="The TorchFT replica ID of this run.",
-        )
-
-        self.parser.add_argument(
-            "--fault_tolerance.group_size",
-            type=int,
-            default=0,
-            help="""
-                The number of TorchFT replicate groups. This number will be used for
-                dataloader to split the dataset across the replicate groups and FSDP
-                dimension
-            """,
-        )
-
-        self.parser.add_argument(
-            "--fault_tolerance.min_replica_size",
-            type=int,
-            default=1,
-            help="The minimum number of FT replica for each step.",
-        )
+    @property
+    def parser(self) -> argparse.ArgumentParser:
+        """
+        The argument parser of this config.
+        Parsing goes through a parser shared by all instances, this returns a private copy of it
+        so that callers adding arguments to it only affect this instance.
+        """
+        if self._parser is None:
+            self._parser = copy.deepcopy(_build_parser())
+        return self._parser
 
     def to_dict(self):
         return self.args_dict
 
     def parse_args(self, args_list: list = sys.argv[1:]):
-        args, cmd_args = self.parse_args_from_command_line(args_list)
-        config_file = getattr(args, "job.config_file", None)
-        # build up a two level dict
-        args_dict = self._args_to_two_level_dict(args)
+        if self._parser is None:
+            parser, tables = _build_parser(), _shared_parser_tables()
+        else:
+            # the private parser may have been changed since the last parse
+            parser, tables = self._parser, _parser_tables(self._parser)
+        prefetched_file = _find_config_file(args_list)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # load the config file in the background while the command line is being parsed
+            prefetched_config = executor.submit(_load_toml, prefetched_file) if prefetched_file is not None else None
+            cmd_args = self._parse_cmd_args(args_list, parser, tables)
+        config_file = cmd_args.__dict__.get("job.config_file")
+        # build up a two level dict from a copy of the argument defaults,
+        # list defaults are copied as well so that no instance can mutate those of the others
+        args_dict = {
+            k: {n: list(x) if type(x) is list else x for n, x in v.items()} for k, v in tables.default_args.items()
+        }
         if config_file is not None:
             try:
-                with open(config_file, "rb") as f:
-                    for k, v in tomllib.load(f).items():
-                        # to prevent overwrite of non-specified keys
-                        args_dict[k] |= v
-            except (FileNotFoundError, tomllib.TOMLDecodeError) as e:
-                logger.exception(
-                    f"Error while loading the configuration file: {config_file}"
-                )
-                logger.exception(f"Error details: {str(e)}")
-                raise e
-
-        # Checking string-list arguments are properly split into a list
-        # if split-points came from 'args' (from cmd line) it would have already been parsed into a list by that parser
-        string_list_argnames = self._get_string_list_argument_names()
-        for n in string_list_argnames:
-            check_string_list_argument(args_dict, n)
+                if prefetched_config is not None and prefetched_file == config_file:
+                    config = prefetched_config.result()
+                else:
+                    config = _load_toml(config_file)
+                string_list_args = tables.string_list_args
+                for k, v in config.items():
+                    _merge_toml_section(args_dict.setdefault(k, {}), v, string_list_args.get(k, ()))
+            except (FileNotFoundError, *_TOML_DECODE_ERRORS) as e:
+                logger.exception("Error while loading the configuration file %s: %s", config_file, e)
+                raise
 
         # override args dict with cmd_args
-        cmd_args_dict = self._args_to_two_level_dict(cmd_args)
+        cmd_args_dict = self._args_to_two_level_dict(cmd_args, tables.argname_keys)
         for section, section_args in cmd_args_dict.items():
-            for k, v in section_args.items():
-                args_dict[section][k] = v
+            args_dict.setdefault(section, {}).update(section_args)
 
+        # drop the sections of the previous config, whether materialized or assigned, other assigned attributes stay
+        sections = args_dict.keys() if self.args_dict is None else args_dict.keys() | self.args_dict.keys()
         self.args_dict = args_dict
-
-        for k, v in args_dict.items():
-            class_type = type(k.title(), (), v)
-            setattr(self, k, class_type())
+        self._resolved = {k: v for k, v in self._resolved.items() if k not in sections}
         self._validate_config()
 
-    def _args_to_two_level_dict(self, args: argparse.Namespace) -> defaultdict:
-        args_dict = defaultdict(defaultdict)
-        for k, v in vars(args).items():
-            first_level_key, second_level_key = k.split(".", 1)
-            args_dict[first_level_key][second_level_key] = v
+    def __setattr__(self, name: str, value):
+        if name in JobConfig.__slots__:
+            object.__setattr__(self, name, value)
+        else:
+            # there is no instance `__dict__`, so other attributes, e.g. a section
+            # overridden by the caller, are kept along with the materialized sections
+            self._resolved[name] = value
+
+    def __getattr__(self, name: str):
+        # only reached for names missing from the instance, i.e. config sections and assigned attributes,
+        # the sections are materialized lazily so that unused sections cost nothing
+        # slots not assigned yet, e.g. while unpickling, must not recurse into here
+        if name in JobConfig.__slots__:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        try:
+            return self._resolved[name]
+        except KeyError:
+            pass
+        args_dict = self.args_dict
+        if args_dict is None or name not in args_dict:
+            raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+        section = self._resolved[name] = _build_section(name, args_dict[name])
+        return section
+
+    def _args_to_two_level_dict(
+        self, args: argparse.Namespace, argname_keys: MappingProxyType
+    ) -> dict[str, dict[str, any]]:
+        args_dict = {}
+        for k, v in args.__dict__.items():
+            first_level_key, second_level_key = argname_keys[k]
+            args_dict.setdefault(first_level_key, {})[second_level_key] = v
         return args_dict
 
     def _validate_config(self) -> None:
@@ -924,37 +1199,19 @@ class JobConfig:
         assert self.model.config
         assert self.model.tokenizer_path
 
-    def _get_string_list_argument_names(self) -> list[str]:
-        """Get the parser argument names of type `string_list`."""
-        string_list_args = [
-            v.dest for v in self.parser._actions if v.type is string_list
-        ]
-        return string_list_args
-
-    def parse_args_from_command_line(
-        self, args_list
-    ) -> Tuple[argparse.Namespace, argparse.Namespace]:
+    def _parse_cmd_args(
+        self, args_list, parser: argparse.ArgumentParser, tables: _ParserTables
+    ) -> argparse.Namespace:
         """
-        Parse command line arguments and return the parsed args and the command line only args
+        Parse command line arguments and return the command line only args
         """
-        args = self.parser.parse_args(args_list)
-        string_list_argnames = set(self._get_string_list_argument_names())
-
-        # aux parser to parse the command line only args, with no defaults from main parser
-        aux_parser = argparse.ArgumentParser(argument_default=argparse.SUPPRESS)
-        for arg, val in vars(args).items():
-            if isinstance(val, bool):
-                aux_parser.add_argument(
-                    "--" + arg, action="store_true" if val else "store_false"
-                )
-            elif arg in string_list_argnames:
-                # without this special case, type inference breaks here,
-                # since the inferred type is just 'list' and it ends up flattening
-                # e.g. from ["layers.0", "layers.1"] into ["l", "a", "y", "e", "r", "s", ".0", ...]
-                aux_parser.add_argument("--" + arg, type=string_list)
-            else:
-                aux_parser.add_argument("--" + arg, type=type(val))
-
-        cmd_args, _ = aux_parser.parse_known_args(args_list)
-
-        return args, cmd_args
+        # every arg starts out unset so that the parser does not fill in its defaults
+        args = parser.parse_args(args_list, argparse.Namespace(**dict.fromkeys(tables.argname_keys, _UNSET)))
+        parsed = args.__dict__
+        for arg in [k for k, v in parsed.items() if v is _UNSET]:
+            del parsed[arg]
+        for arg in tables.string_list_argnames & parsed.keys():
+            # the parser gives one list per value due to nargs,
+            # e.g. [["layers.0", "layers.1"], ["layers.2"]]
+            parsed[arg] = [name for names in parsed[arg] for name in names]
+        return args